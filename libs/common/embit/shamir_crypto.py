@@ -32,23 +32,62 @@
 # POSSIBILITY OF SUCH DAMAGE.
 # ===================================================================
 import hashlib
+import hmac
+from .misc import const
 from .wordlists.bip39 import WORDLIST
 from .bip39 import mnemonic_to_bytes, mnemonic_from_bytes
+
+try:
+    # C implementation of the field arithmetic, see usermods/ugf2n
+    import ugf2n as _ugf2n
+except ImportError:
+    _ugf2n = None
+
 PBKDF2_ROUNDS = const(2048)
 
 
+try:
+    _bit_length = int.bit_length
+except AttributeError:
+    # MicroPython ints don't have bit_length()
+    def _bit_length(n):
+        return len(bin(n)) - 2 if n else 0
+
+
 def _mult_gf2(f1, f2):
     """Multiply two polynomials in GF(2)"""
 
-    # Ensure f2 is the smallest
-    if f2 > f1:
-        f1, f2 = f2, f1
+    # Ensure f2 is the smallest, conditional XOR swap without a branch:
+    # mask is -1 (all ones) if f2 > f1, 0 otherwise
+    mask = -(f2 > f1)
+    t = (f1 ^ f2) & mask
+    f1 ^= t
+    f2 ^= t
+    return _mult_gf2_sorted(f1, f2)
+
+
+def _mult_gf2_sorted(f1, f2):
+    """Multiply two polynomials in GF(2), f2 should be the smaller one"""
     z = 0
+    if f2 < 256:
+        # short multipliers (e.g. quotients in the GCD), bit by bit
+        while f2:
+            if f2 & 1:
+                z ^= f1
+            f1 <<= 1
+            f2 >>= 1
+        return z
+    # 4 bits of f2 per iteration, table[i] = f1 * i
+    table = [0, f1]
+    for i in range(2, 16, 2):
+        t = table[i >> 1] << 1
+        table.append(t)
+        table.append(t ^ f1)
+    shift = 0
     while f2:
-        if f2 & 1:
-            z ^= f1
-        f1 <<= 1
-        f2 >>= 1
+        z ^= table[f2 & 15] << shift
+        shift += 4
+        f2 >>= 4
     return z
 
 
@@ -62,36 +101,75 @@ def _div_gf2(a, b):
     if (a < b):
         return 0, a
 
-    def deg(n):
-        if n == 0:
-            return 0
-        else:
-            return len(bin(abs(n))) - 2
-
-    # deg = int.bit_length
     q = 0
     r = a
-    d = deg(b)
-    while deg(r) >= d:
-        s = 1 << (deg(r) - d)
-        q ^= s
-        r ^= _mult_gf2(b, s)
+    d = _bit_length(b)
+    dr = _bit_length(r)
+    while dr >= d:
+        # multiplication by a single monomial is a shift
+        shift = dr - d
+        q ^= 1 << shift
+        r ^= b << shift
+        dr = _bit_length(r)
     return (q, r)
 
-def mnemonic_to_shares(mnemonic: str, nb_shares: int, wordlist=WORDLIST):
+def _hkdf_expand(prk, info, length, digestmod="sha512"):
+    """HKDF-Expand from RFC 5869"""
+    # the block counter is a single byte
+    if length > 255 * hashlib.new(digestmod).digest_size:
+        raise ValueError("HKDF-Expand length can't be larger than 255 digests")
+    okm = b""
+    t = b""
+    i = 1
+    while len(okm) < length:
+        t = hmac.new(prk, t + info + bytes([i]), digestmod).digest()
+        okm += t
+        i += 1
+    return okm[:length]
+
+
+def mnemonic_to_shares(mnemonic: str, nb_shares: int, wordlist=WORDLIST, expand=False,
+                       hash_name="sha512"):
+    """
+    Derive nb_shares-1 polynomial coefficients from the mnemonic.
+    By default every coefficient is derived with its own PBKDF2.
+    If expand is True only one PBKDF2 is used to get a master key
+    and all coefficients are expanded from it with HKDF-Expand.
+    This is much faster, but gives different coefficients (and shares).
+    hash_name selects the hash function for PBKDF2 and HKDF ("sha512" or "sha256").
+    "sha256" is faster on CPUs with SHA extensions, but also changes the shares.
+    """
+    # CPython accepts any hash here, hashlib on the device doesn't,
+    # so the same call would give shares on one and fail on the other
+    if hash_name not in ("sha256", "sha512"):
+        raise ValueError("Unsupported hash function: %s" % hash_name)
     rnd_bytes = [None] * nb_shares
     if wordlist is not None:
         # insert the secret in the last position in the list
         rnd_bytes[-1] = mnemonic_to_bytes(mnemonic, wordlist=wordlist)
+    size = len(rnd_bytes[-1])
+
+    if expand:
+        # master key length is the digest size of the hash function
+        master = hashlib.pbkdf2_hmac(
+            hash_name,
+            mnemonic.encode("utf-8"),
+            ("mnemonic-shamir-master number of shares " + str(nb_shares)).encode("utf-8"),
+            PBKDF2_ROUNDS,
+        )
+        okm = _hkdf_expand(master, b"shamir coefficients", size * (nb_shares - 1), hash_name)
+        for i in range(0, nb_shares-1):
+            rnd_bytes[i] = okm[size*i:size*(i+1)]
+        return rnd_bytes
 
     for i in range(0, nb_shares-1):
         password = "shamir" + str(i) + " number of shares " + str(nb_shares)
         rnd_bytes[i] = hashlib.pbkdf2_hmac(
-        "sha512",
+        hash_name,
         mnemonic.encode("utf-8"),
         ("mnemonic" + password).encode("utf-8"),
         PBKDF2_ROUNDS,
-        len(rnd_bytes[-1]),
+        size,
     )
     return rnd_bytes
 
@@ -117,10 +195,33 @@ class _Element(object):
     # irr_poly = 1 + 2 + 4 + 128 + 2 ** 128
     # irr_poly = irr_poly_table[128]
 
+    field_size = None
+
+    # share indexes cached by _Element.small()
+    SMALL_CACHE_SIZE = const(256)
+
     @staticmethod
     def set_field_size(field_size):
+        # everything below only depends on the field size,
+        # split and combine set it on every call
+        if field_size == _Element.field_size:
+            return
         _Element.field_size = field_size
         _Element.irr_poly = _Element.irr_poly_table[field_size]
+        _Element.irr_bytes = _Element.irr_poly.to_bytes(field_size//8 + 1, 'big')
+        # Barrett constant for ugf2n, reduction then takes two multiplications
+        _Element.barrett_mu = _div_gf2(1 << (2 * field_size), _Element.irr_poly)[0]
+        _Element.mu_bytes = _Element.barrett_mu.to_bytes(field_size//8 + 1, 'big')
+        # reduction of 4 bits at a time: reduce_table[i] = i * irr_poly.
+        # Low terms of all irreducible polynomials in the table are
+        # at least 15 bits below x^field_size, so reducing one nibble
+        # never touches the nibbles above it.
+        _Element.reduce_table = [_mult_gf2(i, _Element.irr_poly) for i in range(16)]
+        # elements cache their encoding, so constants are per field size
+        _Element.ZERO = _Element(0)
+        _Element.ONE = _Element(1)
+        # filled on demand, most of the indexes are never used
+        _Element._small_cache = [None] * _Element.SMALL_CACHE_SIZE
 
     def __init__(self, encoded_value):
         """Initialize the element to a certain value.
@@ -128,13 +229,40 @@ class _Element(object):
         a _Element.field_size-bit integer, where each bit represents a polynomial
         coefficient. The LSB is the constant coefficient.
         """
+        # encoded form is kept to avoid int -> bytes conversions
+        # when the element is passed to ugf2n or returned to the user,
+        # and the integer form is only computed when it is used:
+        # with ugf2n most elements never leave the encoded form.
+        self._encoded = None
+        self._int = None
         if type(encoded_value) is int:
-            self._value = encoded_value
+            self._int = encoded_value
         elif len(encoded_value) == _Element.field_size//8:
-            self._value = int.from_bytes(encoded_value, 'big')
+            if type(encoded_value) is bytes:
+                self._encoded = encoded_value
+            else:
+                self._int = int.from_bytes(encoded_value, 'big')
         else:
             raise ValueError("The encoded value must be an integer or a field_size/8 byte string")
 
+    @property
+    def _value(self):
+        if self._int is None:
+            self._int = int.from_bytes(self._encoded, 'big')
+        return self._int
+
+    @staticmethod
+    def small(i):
+        """Element for a small integer (e.g. a share index).
+        Elements are never modified, so they are cached and shared."""
+        if not 0 <= i < _Element.SMALL_CACHE_SIZE:
+            return _Element(i)
+        e = _Element._small_cache[i]
+        if e is None:
+            e = _Element(i)
+            _Element._small_cache[i] = e
+        return e
+
     def __eq__(self, other):
         return self._value == other._value
 
@@ -144,33 +272,89 @@ class _Element(object):
 
     def encode(self):
         """Return the field element, encoded as a field_size/8 byte string."""
-        return self._value.to_bytes(_Element.field_size//8, 'big')
+        if self._encoded is None:
+            self._encoded = self._value.to_bytes(_Element.field_size//8, 'big')
+        return self._encoded
         # return long_to_bytes(self._value, _Element.field_size/8)
 
     def __mul__(self, factor):
 
+        if _ugf2n is not None:
+            return _Element(_ugf2n.mul(self.encode(), factor.encode(), _Element.irr_bytes,
+                                       _Element.field_size, _Element.mu_bytes))
+
         f1 = self._value
         f2 = factor._value
 
-        # Make sure that f2 is the smallest, to speed up the loop
-        if f2 > f1:
-            f1, f2 = f2, f1
-
         if self.irr_poly in (f1, f2):
-            return _Element(0)
+            return _Element.ZERO
 
-        mask1 = 2 ** _Element.field_size
-        v, z = f1, 0
-        while f2:
-            # if f2 ^ 1: z ^= v
-            mask2 = int(bin(f2 & 1)[2:] * _Element.field_size, 2)
-            z = (mask2 & (z ^ v)) | ((mask1 - mask2 - 1) & z)
-            v <<= 1
-            # if v & mask1: v ^= self.irr_poly
-            mask3 = int(bin((v >> _Element.field_size) & 1)[2:] * _Element.field_size, 2)
-            v = (mask3 & (v ^ self.irr_poly)) | ((mask1 - mask3 - 1) & v)
-            f2 >>= 1
-        return _Element(z)
+        return _Element(_Element._reduce(_mult_gf2(f1, f2)))
+
+    @staticmethod
+    def _reduce(z):
+        """Reduce a product of two elements modulo irr_poly, 4 bits per iteration."""
+        n = _Element.field_size
+        table = _Element.reduce_table
+        for shift in range(n - 4, -1, -4):
+            z ^= table[(z >> (n + shift)) & 15] << shift
+        return z
+
+    @staticmethod
+    def mul_batch(xs, ys):
+        """Multiply two lists of elements pairwise."""
+        if _ugf2n is not None:
+            values = _ugf2n.mul_batch([x.encode() for x in xs], [y.encode() for y in ys],
+                                      _Element.irr_bytes, _Element.field_size,
+                                      _Element.mu_bytes)
+            return [_Element(v) for v in values]
+        return [x * y for x, y in zip(xs, ys)]
+
+    @staticmethod
+    def dot(xs, ys):
+        """Sum of pairwise products of two lists of elements.
+        Products are accumulated unreduced and reduced only once."""
+        if _ugf2n is not None:
+            value = _ugf2n.dot([x.encode() for x in xs], [y.encode() for y in ys],
+                               _Element.irr_bytes, _Element.field_size,
+                               _Element.mu_bytes)
+            return _Element(value)
+        acc = 0
+        for x, y in zip(xs, ys):
+            acc ^= _mult_gf2(x._value, y._value)
+        return _Element(_Element._reduce(acc))
+
+    @staticmethod
+    def horner(coeffs, xs):
+        """Evaluate polynomial with coefficients coeffs (highest degree first)
+        at every point in xs.
+        Points must be public values (e.g. share indexes): ugf2n skips
+        their zero high limbs, so its timing depends on the points."""
+        if _ugf2n is not None:
+            values = _ugf2n.horner([c.encode() for c in coeffs], [x.encode() for x in xs],
+                                   _Element.irr_bytes, _Element.field_size,
+                                   _Element.mu_bytes)
+            return [_Element(v) for v in values]
+        # all points at once, one batch multiplication per coefficient
+        result = [coeffs[0]] * len(xs)
+        for coeff in coeffs[1:]:
+            result = [r + coeff for r in _Element.mul_batch(xs, result)]
+        return result
+
+    @staticmethod
+    def inverse_batch(elements):
+        """Invert a list of elements using a single inversion (Montgomery's trick)."""
+        # prefix[i] = elements[0] * ... * elements[i]
+        prefix = [elements[0]]
+        for e in elements[1:]:
+            prefix.append(prefix[-1] * e)
+        inv = prefix[-1].inverse()
+        result = [None] * len(elements)
+        for i in range(len(elements) - 1, 0, -1):
+            result[i] = inv * prefix[i - 1]
+            inv = inv * elements[i]
+        result[0] = inv
+        return result
 
     def __add__(self, term):
         return _Element(self._value ^ term._value)
@@ -178,24 +362,60 @@ class _Element(object):
     def inverse(self):
         """Return the inverse of this element in GF(2^_Element.field_size)."""
 
-        # We use the Extended GCD algorithm
-        # http://en.wikipedia.org/wiki/Polynomial_greatest_common_divisor
-
         if self._value == 0:
             raise ValueError("Inversion of zero")
 
+        if _ugf2n is not None:
+            return self._inverse_itoh_tsujii()
+
+        # We use the Extended GCD algorithm
+        # http://en.wikipedia.org/wiki/Polynomial_greatest_common_divisor
+
         r0, r1 = self._value, self.irr_poly
         s0, s1 = 1, 0
         while r1 > 0:
             q = _div_gf2(r0, r1)[0]
-            r0, r1 = r1, r0 ^ _mult_gf2(q, r1)
-            s0, s1 = s1, s0 ^ _mult_gf2(q, s1)
+            # quotient is short, no need to compare the operands
+            r0, r1 = r1, r0 ^ _mult_gf2_sorted(r1, q)
+            s0, s1 = s1, s0 ^ _mult_gf2_sorted(s1, q)
         return _Element(s0)
 
+    def _square(self, times=1):
+        """Return self^(2^times), squarings are done in ugf2n."""
+        return _Element(_ugf2n.sqr(self.encode(), times, _Element.irr_bytes,
+                                   _Element.field_size, _Element.mu_bytes))
+
+    def _inverse_itoh_tsujii(self):
+        """
+        Itoh-Tsujii inversion: a^-1 = a^(2^n-2) = (a^(2^(n-1)-1))^2.
+        b_k = a^(2^k-1) is built with an addition chain on k:
+        b_2k = b_k^(2^k) * b_k and b_(k+1) = b_k^2 * a,
+        so it takes about 2*log2(n) multiplications and n squarings.
+        The sequence of operations only depends on the field size.
+        """
+        m = _Element.field_size - 1
+        beta = self
+        k = 1
+        for i in range(_bit_length(m) - 2, -1, -1):
+            beta = beta._square(k) * beta
+            k *= 2
+            if (m >> i) & 1:
+                beta = beta._square() * self
+                k += 1
+        return beta._square()
+
     def __pow__(self, exponent):
-        result = _Element(self._value)
-        for _ in range(exponent - 1):
-            result = result * self
+        if exponent < 0:
+            raise ValueError("Negative exponent")
+        # square-and-multiply, O(log(exponent)) multiplications
+        result = _Element.ONE
+        base = self
+        while exponent:
+            if exponent & 1:
+                result = result * base
+            exponent >>= 1
+            if exponent:
+                base = base * base
         return result
 
 
@@ -206,7 +426,7 @@ class Shamir(object):
     """
 
     @staticmethod
-    def split(k, n, secret):
+    def split(k, n, secret, expand=False, hash_name="sha512"):
         """Split a secret into ``n`` shares.
         The secret can be reconstructed later using just ``k`` shares
         out of the original ``n``.
@@ -220,15 +440,37 @@ class Shamir(object):
             The number of shares that this method will create.
           secret (byte string):
             A byte string of field_size/8 bytes (e.g. the AES _Element.field_size key).
-          field_size (integer):
-            field_size must be either 128, 160, 192, 224, 256
-            sets the bit field size
+          expand (bool):
+            Derive the coefficients from a single PBKDF2 with HKDF-Expand,
+            see ``mnemonic_to_shares``. Faster, but produces different shares
+            than the default derivation.
+          hash_name (string):
+            Hash function used to derive the coefficients, "sha512" (default) or "sha256".
+            Shares are different for different hash functions.
         Return (tuples):
             ``n`` tuples. A tuple is meant for each participant and it contains two items:
             1. the unique index (an integer)
             2. the share (a byte string, field_size/8 bytes)
         """
 
+        shares = Shamir._split(k, n, secret, expand, hash_name)
+        return [(i, mnemonic_from_bytes(share)) for i, share in shares]
+
+    @staticmethod
+    def split_raw(k, n, secret, expand=False, hash_name="sha512"):
+        """Same as ``split``, but the secret and the shares are byte strings
+        (field_size/8 bytes) instead of mnemonics.
+        Shares are the same as the ones from ``split``:
+        ``split_raw(k, n, mnemonic_to_bytes(m))`` returns
+        the entropy of the mnemonics from ``split(k, n, m)``.
+        """
+        # coefficients are derived from the mnemonic string
+        return Shamir._split(k, n, mnemonic_from_bytes(secret), expand, hash_name)
+
+    @staticmethod
+    def _split(k, n, secret, expand, hash_name):
+        """Split a mnemonic, returns a list of (index, share bytes)"""
+
         #
         # We create a polynomial with random coefficients in GF(2^_Element.field_size):
         #
@@ -236,25 +478,19 @@ class Shamir(object):
         #
         # c_0 is the encoded secret
         #
-        secret_bytes = mnemonic_to_bytes(secret)
-        field_size = len(secret_bytes) * 8
+        coeffs_bytes = mnemonic_to_shares(secret, k, expand=expand, hash_name=hash_name)
+        # the secret is the last one
+        field_size = len(coeffs_bytes[-1]) * 8
 
         _Element.set_field_size(field_size)
-        coeffs_bytes = mnemonic_to_shares(secret, k)
 
         coeffs = [_Element(coeffs_bytes[i]) for i in range(k)]
 
         # Each share is y_i = p(x_i) where x_i is the public index
         # associated to each of the n users.
+        shares = _Element.horner(coeffs, [_Element.small(i) for i in range(1, n + 1)])
 
-        def make_share(user, coeffs):
-            idx = _Element(user)
-            share = _Element(0)
-            for coeff in coeffs:
-                share = idx * share + coeff
-            return mnemonic_from_bytes(share.encode())
-
-        return [(i, make_share(i, coeffs)) for i in range(1, n + 1)]
+        return [(i + 1, shares[i].encode()) for i in range(n)]
 
     @staticmethod
     def combine(shares, wordlist=WORDLIST):
@@ -271,6 +507,17 @@ class Shamir(object):
             The original secret, as a byte string (field_size/8 bytes long).
         """
 
+        shares = [(val[0], mnemonic_to_bytes(val[1], wordlist=wordlist)) for val in shares]
+        return mnemonic_from_bytes(Shamir.combine_raw(shares))
+
+    @staticmethod
+    def combine_raw(shares):
+        """Same as ``combine``, but the shares are (index, byte string) tuples
+        as returned by ``split_raw``.
+        Return:
+            The original secret as a byte string (field_size/8 bytes long).
+        """
+
         #
         # Given k points (x,y), the interpolation polynomial of degree k-1 is:
         #
@@ -284,30 +531,41 @@ class Shamir(object):
         # However, in this case we are purely interested in the constant
         # coefficient of L(x).
         #
-        shares = [(val[0], mnemonic_to_bytes(val[1], wordlist=wordlist)) for val in shares]
         _Element.set_field_size(len(shares[0][1]) * 8)
         k = len(shares)
 
         gf_shares = []
+        seen = set()
         for x in shares:
-            idx = _Element(x[0])
-            value = _Element(x[1])
-            if any(y[0] == idx for y in gf_shares):
+            if x[0] == 0:
+                raise ValueError("Share index can't be zero")
+            if x[0] in seen:
                 raise ValueError("Duplicate share")
-            gf_shares.append((idx, value))
-
-        result = _Element(0)
-        for j in range(k):
-            x_j, y_j = gf_shares[j]
-
-            numerator = _Element(1)
-            denominator = _Element(1)
-
-            for m in range(k):
-                x_m = gf_shares[m][0]
-                if m != j:
-                    numerator *= x_m
-                    denominator *= x_j + x_m
-            result += y_j * numerator * denominator.inverse()
-        return mnemonic_from_bytes(result.encode())
+            seen.add(x[0])
+            gf_shares.append((_Element.small(x[0]), _Element(x[1])))
+
+        #
+        # l_j(0) = \prod_{m \ne j} x_m / (x_j + x_m)
+        #        = total / (x_j * \prod_{m \ne j} (x_j + x_m))
+        #
+        # where total = \prod_{m} x_m is shared by all l_j,
+        # and the k denominators are inverted together with a single inversion.
+        #
+        xs = [x for x, _ in gf_shares]
+        one = _Element.ONE
+        total = one
+        for x_m in xs:
+            total *= x_m
+
+        # all k denominators are computed in parallel,
+        # one batch multiplication per m
+        denominators = xs
+        for m in range(k):
+            x_m = xs[m]
+            denominators = _Element.mul_batch(
+                denominators, [one if j == m else xs[j] + x_m for j in range(k)])
+        inverses = _Element.inverse_batch(denominators)
+
+        result = _Element.dot([y for _, y in gf_shares], inverses) * total
+        return result.encode()
 
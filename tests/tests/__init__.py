@@ -4,4 +4,5 @@ from .test_bech32 import *
 from .test_bip32 import *
 from .test_psbt import *
 from .test_bip39 import *
-from .test_hmac import *
\ No newline at end of file
+from .test_hmac import *
+from .test_shamir import *
\ No newline at end of file
@@ -0,0 +1,130 @@
+from binascii import unhexlify
+from embit.shamir_crypto import Shamir, _hkdf_expand
+from embit.bip39 import mnemonic_to_bytes
+from unittest import TestCase
+
+VECTORS = [
+    (
+        "idea test comic impose corn sustain ancient fresh icon slush thunder roast",
+        3,
+        [
+            (1, "wrong cupboard few insect welcome ozone sudden blanket whisper exile aspect neck"),
+            (2, "enrich enemy snack pull tissue because drama gaze reject remain dry tourist"),
+            (3, "shift photo replace predict cloud fish mutual clinic dilemma cushion quantum slow"),
+            (4, "oval wedding romance oval pact exist damage matter outdoor shrug drastic daughter"),
+            (5, "beach bargain scare off fiscal arm train security blood dwarf push bus"),
+        ],
+    ),
+    (
+        "make wedding leave creek picture nut chalk end wave pen hole punch toy autumn sport diagram theory myth humor choose atom lobster slender loan",
+        2,
+        [
+            (1, "airport bulk title outer cherry cup elegant muffin this penalty recycle discover chat unit sting pioneer inherit fat choice cherry fuel firm security usage"),
+            (2, "level celery egg hurt peasant squirrel three juice super phone spirit merry either slight swing aunt shuffle bacon throw current powder cloud success left"),
+            (3, "admit sentence suspect script canal immune lock parrot soldier pet ask blush marble claim swap notable female spawn please decrease whisper zebra spike ability"),
+        ],
+    ),
+]
+
+# split(k, n, secret, expand=True) of VECTORS
+EXPAND_SHARES = [
+    [
+        (1, "spatial sting figure caught trumpet tiger ethics smooth enact arrow spike caught"),
+        (2, "tone mother grit virtual spike keep session equip token develop ecology snow"),
+        (3, "dwarf olympic bus peanut amused drift lift swing suspect wise iron fancy"),
+        (4, "auto code funny scatter report sight merit save theme trumpet sail inform"),
+        (5, "quarter cherry chapter nominee humor veteran solid copper summer city mobile unhappy"),
+    ],
+    [
+        (1, "toward absorb laptop equip soon also stuff way early hood trash april minor easily vacant cube comfort tape hover ship rice industry forum fantasy"),
+        (2, "element anger junior snake include rent scissors click myself despair kitchen toe couch orbit now cool lady army hospital visual gaze glide turkey ball"),
+        (3, "cheese vacuum kiss rate bonus chase cricket open calm veteran valid dwarf forum spike remove chaos real drive hold boy style narrow kid soul"),
+    ],
+]
+
+# split(k, n, secret, hash_name="sha256") of VECTORS
+SHA256_SHARES = [
+    [
+        (1, "come left crucial dust attract profit soap sun topic neck column doctor"),
+        (2, "speed post know glance merit dose steak cement noodle round sting size"),
+        (3, "month amount gift finish release cost awake pass addict toe boost crash"),
+        (4, "dwarf trick actor rescue game amused umbrella gold marble battle day dynamic"),
+        (5, "bracket emotion blush little ghost jungle cinnamon tide base erosion violin sauce"),
+    ],
+    [
+        (1, "live cloud enemy defy taste bullet dentist kiss drive promote truly glimpse side tribe smoke huge later clown trophy punch proof topple error sausage"),
+        (2, "moment galaxy axis change expose lucky brass connect pact salute grow copy pipe scatter unveil obscure surprise use genius casino engage excuse session sign"),
+        (3, "member mistake child coach client artwork affair broccoli claw rack tissue year luggage chest useless skate electric eye train plunge tribe cinnamon duck tomato"),
+    ],
+]
+
+# split(k, n, secret, expand=True, hash_name="sha256") of VECTORS
+SHA256_EXPAND_SHARES = [
+    [
+        (1, "yellow already crane tragic actor pipe lady outdoor visit unusual artefact nation"),
+        (2, "drop aerobic matter agent future cabin humble jacket brain pair soap tortoise"),
+        (3, "slot symptom next negative hobby gather brain report oyster rug camp slush"),
+        (4, "peanut segment brother wave siege ride wonder program argue damp heart cute"),
+        (5, "company breeze abstract genius width short math head monitor benefit mango cabin"),
+    ],
+    [
+        (1, "poet annual ensure lazy evoke ill length choice obscure motion follow grit library level child steel pencil sand volume inch impose nut oval crunch"),
+        (2, "shine brief between praise ill flip hotel member chunk shiver above deposit chuckle bag day urge grain size fold ordinary valve pretty grit session"),
+        (3, "tone tuna cactus tooth one salad slim twin either village custom vacant exit ozone snap allow cherry tone scare shock modify salt core human"),
+    ],
+]
+
+
+class ShamirTest(TestCase):
+    def test_split(self):
+        for secret, k, shares in VECTORS:
+            self.assertEqual(Shamir.split(k, len(shares), secret), shares)
+
+    def test_combine(self):
+        for secret, k, shares in VECTORS:
+            # any k shares recover the secret
+            self.assertEqual(Shamir.combine(shares[:k]), secret)
+            self.assertEqual(Shamir.combine(shares[-k:]), secret)
+            self.assertEqual(Shamir.combine(list(reversed(shares))), secret)
+            # less than k shares don't
+            self.assertNotEqual(Shamir.combine(shares[: k - 1]), secret)
+
+    def test_expand(self):
+        for (secret, k, shares), expected in zip(VECTORS, EXPAND_SHARES):
+            expanded = Shamir.split(k, len(shares), secret, expand=True)
+            self.assertEqual(expanded, expected)
+            self.assertEqual(Shamir.combine(expanded[-k:]), secret)
+
+    def test_hkdf_expand(self):
+        # RFC 5869, test case 1
+        prk = unhexlify("077709362c2e32df0ddc3f0dc47bba6390b6c73bb50f9c3122ec844ad7c2b3e5")
+        info = unhexlify("f0f1f2f3f4f5f6f7f8f9")
+        okm = unhexlify("3cb25f25faacd57a90434f64d0362f2a2d2d0a90cf1a5a4c5db02d56ecc4c5bf34007208d5b887185865")
+        self.assertEqual(_hkdf_expand(prk, info, 42, "sha256"), okm)
+        self.assertEqual(len(_hkdf_expand(prk, info, 255 * 32, "sha256")), 255 * 32)
+        with self.assertRaises(ValueError):
+            _hkdf_expand(prk, info, 255 * 32 + 1, "sha256")
+
+    def test_sha256(self):
+        for expand, vectors in [(False, SHA256_SHARES), (True, SHA256_EXPAND_SHARES)]:
+            for (secret, k, shares), expected in zip(VECTORS, vectors):
+                hashed = Shamir.split(k, len(shares), secret, expand=expand, hash_name="sha256")
+                self.assertEqual(hashed, expected)
+                self.assertEqual(Shamir.combine(hashed[:k]), secret)
+
+    def test_invalid_hash(self):
+        secret, k, shares = VECTORS[0]
+        for expand in [False, True]:
+            with self.assertRaises(ValueError):
+                Shamir.split(k, len(shares), secret, expand=expand, hash_name="sha1")
+
+    def test_raw(self):
+        for secret, k, shares in VECTORS:
+            raw = Shamir.split_raw(k, len(shares), mnemonic_to_bytes(secret))
+            self.assertEqual(raw, [(i, mnemonic_to_bytes(share)) for i, share in shares])
+            self.assertEqual(Shamir.combine_raw(raw[-k:]), mnemonic_to_bytes(secret))
+
+    def test_duplicate(self):
+        secret, k, shares = VECTORS[0]
+        with self.assertRaises(ValueError):
+            Shamir.combine([shares[0], shares[1], shares[0]])
@@ -0,0 +1,248 @@
+#include <string.h>
+#include "gf2n.h"
+
+#if defined(__PCLMUL__) && defined(__x86_64__)
+#include <wmmintrin.h>
+#endif
+
+// all functions below work on secret data (shares and the secret itself),
+// so there are no branches or memory accesses that depend on the values
+
+/******************************* 64x64 carry-less multiplication *******************************/
+
+#if defined(__PCLMUL__) && defined(__x86_64__)
+
+static inline void clmul64(uint64_t a, uint64_t b, uint64_t *lo, uint64_t *hi){
+    __m128i r = _mm_clmulepi64_si128(_mm_cvtsi64_si128((long long)a), _mm_cvtsi64_si128((long long)b), 0x00);
+    *lo = (uint64_t)_mm_cvtsi128_si64(r);
+    *hi = (uint64_t)_mm_cvtsi128_si64(_mm_unpackhi_epi64(r, r));
+}
+
+#else
+
+// No carry-less multiply instruction (Cortex-M4).
+// Integer multiplication is used instead: every 4th bit of the operands
+// is kept so the carries fall into the holes and are masked out.
+// This gives 16 carry-less partial products per integer multiplication
+// without any table lookups (constant-time), same trick as in BearSSL ghash_ctmul64.
+static inline uint64_t bmul64(uint64_t x, uint64_t y){
+    const uint64_t m0 = 0x1111111111111111ULL;
+    const uint64_t m1 = 0x2222222222222222ULL;
+    const uint64_t m2 = 0x4444444444444444ULL;
+    const uint64_t m3 = 0x8888888888888888ULL;
+    uint64_t x0 = x & m0, x1 = x & m1, x2 = x & m2, x3 = x & m3;
+    uint64_t y0 = y & m0, y1 = y & m1, y2 = y & m2, y3 = y & m3;
+    uint64_t z0 = (x0 * y0) ^ (x1 * y3) ^ (x2 * y2) ^ (x3 * y1);
+    uint64_t z1 = (x0 * y1) ^ (x1 * y0) ^ (x2 * y3) ^ (x3 * y2);
+    uint64_t z2 = (x0 * y2) ^ (x1 * y1) ^ (x2 * y0) ^ (x3 * y3);
+    uint64_t z3 = (x0 * y3) ^ (x1 * y2) ^ (x2 * y1) ^ (x3 * y0);
+    return (z0 & m0) | (z1 & m1) | (z2 & m2) | (z3 & m3);
+}
+
+static inline uint64_t rev64(uint64_t x){
+    x = ((x & 0x5555555555555555ULL) << 1) | ((x >> 1) & 0x5555555555555555ULL);
+    x = ((x & 0x3333333333333333ULL) << 2) | ((x >> 2) & 0x3333333333333333ULL);
+    x = ((x & 0x0F0F0F0F0F0F0F0FULL) << 4) | ((x >> 4) & 0x0F0F0F0F0F0F0F0FULL);
+    x = ((x & 0x00FF00FF00FF00FFULL) << 8) | ((x >> 8) & 0x00FF00FF00FF00FFULL);
+    x = ((x & 0x0000FFFF0000FFFFULL) << 16) | ((x >> 16) & 0x0000FFFF0000FFFFULL);
+    return (x << 32) | (x >> 32);
+}
+
+static inline void clmul64(uint64_t a, uint64_t b, uint64_t *lo, uint64_t *hi){
+    *lo = bmul64(a, b);
+    // high half is the low half of the bit-reversed product
+    *hi = rev64(bmul64(rev64(a), rev64(b))) >> 1;
+}
+
+#endif
+
+/******************************* field arithmetic *******************************/
+
+int gf2n_load(const GF2N_FIELD *field, gf2n_t out, const uint8_t *buf, size_t len){
+    size_t nbytes = field->nbits / 8;
+    memset(out, 0, sizeof(gf2n_t));
+    for(size_t i = 0; i < len; i++){
+        uint8_t c = buf[len - 1 - i];
+        if(i >= nbytes){
+            if(c != 0){
+                return -1;
+            }
+            continue;
+        }
+        out[i / 8] |= (uint64_t)c << (8 * (i % 8));
+    }
+    return 0;
+}
+
+void gf2n_store(const GF2N_FIELD *field, uint8_t *buf, const gf2n_t in){
+    size_t nbytes = field->nbits / 8;
+    for(size_t i = 0; i < nbytes; i++){
+        buf[nbytes - 1 - i] = (uint8_t)(in[i / 8] >> (8 * (i % 8)));
+    }
+}
+
+/******************************* polynomial helpers *******************************/
+
+// r = a * b as polynomials, r has alen + blen limbs
+static void poly_mul(uint64_t *r, const uint64_t *a, size_t alen, const uint64_t *b, size_t blen){
+    memset(r, 0, (alen + blen) * sizeof(uint64_t));
+    for(size_t i = 0; i < alen; i++){
+        for(size_t j = 0; j < blen; j++){
+            uint64_t lo, hi;
+            clmul64(a[i], b[j], &lo, &hi);
+            r[i + j] ^= lo;
+            r[i + j + 1] ^= hi;
+        }
+    }
+}
+
+// r = a >> shift, r has rlen limbs
+static void poly_shr(uint64_t *r, size_t rlen, const uint64_t *a, size_t alen, size_t shift){
+    size_t w = shift / 64;
+    size_t b = shift % 64;
+    for(size_t i = 0; i < rlen; i++){
+        uint64_t v = 0;
+        if(i + w < alen){
+            v = a[i + w] >> b;
+            if(b > 0 && i + w + 1 < alen){
+                v |= a[i + w + 1] << (64 - b);
+            }
+        }
+        r[i] = v;
+    }
+}
+
+// r ^= a << shift, bits that don't fit in rlen limbs are dropped
+static void poly_xor_shl(uint64_t *r, size_t rlen, const uint64_t *a, size_t alen, size_t shift){
+    size_t w = shift / 64;
+    size_t b = shift % 64;
+    for(size_t j = 0; j < alen && j + w < rlen; j++){
+        r[j + w] ^= a[j] << b;
+        if(b > 0 && j + w + 1 < rlen){
+            r[j + w + 1] ^= a[j] >> (64 - b);
+        }
+    }
+}
+
+static void load_be(uint64_t *out, size_t nlimbs, const uint8_t *buf, size_t len){
+    memset(out, 0, nlimbs * sizeof(uint64_t));
+    for(size_t i = 0; i < len && i / 8 < nlimbs; i++){
+        out[i / 8] |= (uint64_t)buf[len - 1 - i] << (8 * (i % 8));
+    }
+}
+
+/******************************* field arithmetic *******************************/
+
+// mu = floor(x^(2*nbits) / irr), long division.
+// Only depends on the field, so branches are fine here.
+static void gf2n_barrett_mu(GF2N_FIELD *field){
+    size_t nbits = field->nbits;
+    size_t irrlimbs = GF2N_LIMBS(nbits + 1);
+    uint64_t rem[2 * GF2N_MAX_LIMBS];
+    memset(rem, 0, sizeof(rem));
+    rem[(2 * nbits) / 64] = (uint64_t)1 << ((2 * nbits) % 64);
+    memset(field->mu, 0, sizeof(field->mu));
+    for(size_t i = 2 * nbits; i >= nbits; i--){
+        if((rem[i / 64] >> (i % 64)) & 1){
+            size_t shift = i - nbits;
+            field->mu[shift / 64] |= (uint64_t)1 << (shift % 64);
+            poly_xor_shl(rem, 2 * GF2N_MAX_LIMBS, field->irr, irrlimbs, shift);
+        }
+    }
+}
+
+int gf2n_field_init(GF2N_FIELD *field, const uint8_t *irr, size_t irr_len,
+                    const uint8_t *mu, size_t mu_len, size_t nbits){
+    if(nbits == 0 || nbits > GF2N_MAX_BITS || nbits % 8 != 0){
+        return -1;
+    }
+    // leading coefficient of both irr and mu is x^nbits
+    if(irr_len != nbits / 8 + 1 || irr[0] != 1){
+        return -1;
+    }
+    if(mu != NULL && (mu_len != nbits / 8 + 1 || mu[0] != 1)){
+        return -1;
+    }
+    field->nbits = nbits;
+    field->nlimbs = GF2N_LIMBS(nbits);
+    load_be(field->irr, GF2N_MAX_LIMBS, irr, irr_len);
+    memcpy(field->irr_low, field->irr, sizeof(field->irr));
+    field->irr_low[nbits / 64] ^= (uint64_t)1 << (nbits % 64);
+    if(mu != NULL){
+        load_be(field->mu, GF2N_MAX_LIMBS, mu, mu_len);
+    }else{
+        gf2n_barrett_mu(field);
+    }
+    return 0;
+}
+
+// Barrett reduction of a product of two field elements (2 * nlimbs limbs) in place,
+// result ends up in the first nlimbs limbs:
+// q = ((c >> nbits) * mu) >> nbits
+// c = (c ^ q * irr_low) mod x^nbits
+static void gf2n_reduce(const GF2N_FIELD *field, uint64_t *c){
+    size_t nbits = field->nbits;
+    size_t nlimbs = field->nlimbs;
+    size_t mulimbs = GF2N_LIMBS(nbits + 1);
+    uint64_t h[GF2N_MAX_LIMBS];
+    uint64_t q[GF2N_MAX_LIMBS];
+    uint64_t t[2 * GF2N_MAX_LIMBS];
+    poly_shr(h, nlimbs, c, 2 * nlimbs, nbits);
+    poly_mul(t, h, nlimbs, field->mu, mulimbs);
+    poly_shr(q, nlimbs, t, nlimbs + mulimbs, nbits);
+    poly_mul(t, q, nlimbs, field->irr_low, nlimbs);
+    for(size_t i = 0; i < nlimbs; i++){
+        c[i] ^= t[i];
+    }
+    if(nbits % 64){
+        c[nlimbs - 1] &= ((uint64_t)1 << (nbits % 64)) - 1;
+    }
+}
+
+void gf2n_add(const GF2N_FIELD *field, gf2n_t r, const gf2n_t a, const gf2n_t b){
+    for(size_t i = 0; i < field->nlimbs; i++){
+        r[i] = a[i] ^ b[i];
+    }
+}
+
+void gf2n_mul(const GF2N_FIELD *field, gf2n_t r, const gf2n_t a, const gf2n_t b){
+    uint64_t tmp[2 * GF2N_MAX_LIMBS];
+    poly_mul(tmp, a, field->nlimbs, b, field->nlimbs);
+    gf2n_reduce(field, tmp);
+    memset(r, 0, sizeof(gf2n_t));
+    memcpy(r, tmp, field->nlimbs * sizeof(uint64_t));
+}
+
+// the value is public, so branches on it are fine
+void gf2n_const_init(const GF2N_FIELD *field, GF2N_CONST *c, const gf2n_t value){
+    memcpy(c->value, value, sizeof(gf2n_t));
+    c->nlimbs = field->nlimbs;
+    while(c->nlimbs > 1 && c->value[c->nlimbs - 1] == 0){
+        c->nlimbs--;
+    }
+}
+
+void gf2n_mul_const(const GF2N_FIELD *field, gf2n_t r, const gf2n_t a, const GF2N_CONST *c){
+    uint64_t tmp[2 * GF2N_MAX_LIMBS];
+    memset(tmp, 0, sizeof(tmp));
+    poly_mul(tmp, a, field->nlimbs, c->value, c->nlimbs);
+    gf2n_reduce(field, tmp);
+    memset(r, 0, sizeof(gf2n_t));
+    memcpy(r, tmp, field->nlimbs * sizeof(uint64_t));
+}
+
+void gf2n_mul_acc(const GF2N_FIELD *field, gf2n_wide_t acc, const gf2n_t a, const gf2n_t b){
+    uint64_t tmp[2 * GF2N_MAX_LIMBS];
+    poly_mul(tmp, a, field->nlimbs, b, field->nlimbs);
+    for(size_t i = 0; i < 2 * field->nlimbs; i++){
+        acc[i] ^= tmp[i];
+    }
+}
+
+void gf2n_reduce_wide(const GF2N_FIELD *field, gf2n_t r, const gf2n_wide_t acc){
+    uint64_t tmp[2 * GF2N_MAX_LIMBS];
+    memcpy(tmp, acc, sizeof(tmp));
+    gf2n_reduce(field, tmp);
+    memset(r, 0, sizeof(gf2n_t));
+    memcpy(r, tmp, field->nlimbs * sizeof(uint64_t));
+}
@@ -0,0 +1,67 @@
+#ifndef __GF2N_H__
+#define __GF2N_H__
+
+#include <stdint.h>
+#include <stddef.h>
+
+// largest supported field, GF(2^256)
+#define GF2N_MAX_BITS 256
+#define GF2N_LIMBS(nbits) (((nbits) + 63) / 64)
+// the irreducible polynomial has nbits+1 bits
+#define GF2N_MAX_LIMBS GF2N_LIMBS(GF2N_MAX_BITS + 1)
+
+typedef struct _GF2N_FIELD {
+    size_t nbits;
+    size_t nlimbs;
+    // irreducible polynomial, little-endian 64-bit limbs
+    uint64_t irr[GF2N_MAX_LIMBS];
+    // irreducible polynomial without the leading x^nbits term
+    uint64_t irr_low[GF2N_MAX_LIMBS];
+    // Barrett constant floor(x^(2*nbits) / irr)
+    uint64_t mu[GF2N_MAX_LIMBS];
+} GF2N_FIELD;
+
+// field elements are stored as GF2N_MAX_LIMBS little-endian 64-bit limbs,
+// only the first field->nlimbs limbs are used
+typedef uint64_t gf2n_t[GF2N_MAX_LIMBS];
+// unreduced product of two field elements
+typedef uint64_t gf2n_wide_t[2 * GF2N_MAX_LIMBS];
+
+// multiplier that is used many times (e.g. evaluation point in horner),
+// prepared once with gf2n_const_init.
+// Only for public values: the number of limbs depends on the value.
+typedef struct _GF2N_CONST {
+    gf2n_t value;
+    // number of significant limbs of value
+    size_t nlimbs;
+} GF2N_CONST;
+
+// mu is a precomputed big-endian Barrett constant floor(x^(2*nbits) / irr),
+// if mu is NULL it is computed here
+// returns 0 on success, -1 if nbits, irr or mu are not valid
+int gf2n_field_init(GF2N_FIELD *field, const uint8_t *irr, size_t irr_len,
+                    const uint8_t *mu, size_t mu_len, size_t nbits);
+
+// big-endian byte string <-> limbs
+// gf2n_load returns -1 if the value doesn't fit in the field
+int gf2n_load(const GF2N_FIELD *field, gf2n_t out, const uint8_t *buf, size_t len);
+void gf2n_store(const GF2N_FIELD *field, uint8_t *buf, const gf2n_t in);
+
+// r = a + b, r can alias a or b
+void gf2n_add(const GF2N_FIELD *field, gf2n_t r, const gf2n_t a, const gf2n_t b);
+
+// r = a * b mod irr, r can alias a or b
+void gf2n_mul(const GF2N_FIELD *field, gf2n_t r, const gf2n_t a, const gf2n_t b);
+
+// prepare a public multiplier for gf2n_mul_const
+void gf2n_const_init(const GF2N_FIELD *field, GF2N_CONST *c, const gf2n_t value);
+// r = a * c mod irr, skips the zero high limbs of c, r can alias a
+void gf2n_mul_const(const GF2N_FIELD *field, gf2n_t r, const gf2n_t a, const GF2N_CONST *c);
+
+// sums of products with a single reduction:
+// acc ^= a * b without reduction, acc should be zeroed before the first call
+void gf2n_mul_acc(const GF2N_FIELD *field, gf2n_wide_t acc, const gf2n_t a, const gf2n_t b);
+// r = acc mod irr
+void gf2n_reduce_wide(const GF2N_FIELD *field, gf2n_t r, const gf2n_wide_t acc);
+
+#endif
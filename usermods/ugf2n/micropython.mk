@@ -0,0 +1,14 @@
+UGF2N_MOD_DIR := $(USERMOD_DIR)
+
+# Add all C files to SRC_USERMOD.
+SRC_USERMOD += $(UGF2N_MOD_DIR)/gf2n/gf2n.c
+SRC_USERMOD += $(UGF2N_MOD_DIR)/ugf2n.c
+
+# We can add our module folder to include paths if needed
+CFLAGS_USERMOD += -I$(UGF2N_MOD_DIR)/gf2n -DMODULE_UGF2N_ENABLED=1
+
+# x86_64 builds (unix port) use the carry-less multiplication instruction,
+# other targets (STM32) use the portable implementation
+ifneq ($(findstring x86_64,$(shell $(CC) -dumpmachine 2>/dev/null)),)
+CFLAGS_USERMOD += -mpclmul
+endif
@@ -0,0 +1,187 @@
+// Include required definitions first.
+#include "py/obj.h"
+#include "py/runtime.h"
+#include "py/builtin.h"
+#include "py/objlist.h"
+#include <string.h>
+#include "gf2n.h"
+
+// irr, nbits and optional mu arguments
+STATIC void ugf2n_field_init(GF2N_FIELD *field, size_t n_args, const mp_obj_t *args){
+    mp_buffer_info_t irrbuf;
+    mp_get_buffer_raise(args[0], &irrbuf, MP_BUFFER_READ);
+    mp_int_t nbits = mp_obj_get_int(args[1]);
+    mp_buffer_info_t mubuf = { .buf = NULL, .len = 0 };
+    if(n_args > 2 && args[2] != mp_const_none){
+        mp_get_buffer_raise(args[2], &mubuf, MP_BUFFER_READ);
+    }
+    if(nbits <= 0 || gf2n_field_init(field, irrbuf.buf, irrbuf.len, mubuf.buf, mubuf.len, (size_t)nbits) != 0){
+        mp_raise_ValueError("Invalid field");
+    }
+}
+
+STATIC void ugf2n_load(const GF2N_FIELD *field, gf2n_t out, mp_obj_t obj){
+    mp_buffer_info_t buf;
+    mp_get_buffer_raise(obj, &buf, MP_BUFFER_READ);
+    if(gf2n_load(field, out, buf.buf, buf.len) != 0){
+        mp_raise_ValueError("Value doesn't fit in the field");
+    }
+}
+
+STATIC mp_obj_t ugf2n_new_element(const GF2N_FIELD *field, const gf2n_t value){
+    vstr_t vstr;
+    vstr_init_len(&vstr, field->nbits / 8);
+    gf2n_store(field, (byte*)vstr.buf, value);
+    return mp_obj_new_str_from_vstr(&mp_type_bytes, &vstr);
+}
+
+/****************************** mul ******************************/
+
+// ugf2n.mul(a, b, irr, nbits, mu=None)
+// a, b - big-endian field elements, irr - big-endian irreducible polynomial,
+// mu - big-endian Barrett constant floor(x^(2*nbits) / irr), computed if not provided
+STATIC mp_obj_t ugf2n_mul(size_t n_args, const mp_obj_t *args){
+    GF2N_FIELD field;
+    ugf2n_field_init(&field, n_args - 2, args + 2);
+    gf2n_t a, b;
+    ugf2n_load(&field, a, args[0]);
+    ugf2n_load(&field, b, args[1]);
+    gf2n_mul(&field, a, a, b);
+    return ugf2n_new_element(&field, a);
+}
+STATIC MP_DEFINE_CONST_FUN_OBJ_VAR_BETWEEN(ugf2n_mul_obj, 4, 5, ugf2n_mul);
+
+/****************************** sqr ******************************/
+
+// ugf2n.sqr(a, times, irr, nbits, mu=None)
+// squares a number of times, returns a^(2^times)
+STATIC mp_obj_t ugf2n_sqr(size_t n_args, const mp_obj_t *args){
+    GF2N_FIELD field;
+    ugf2n_field_init(&field, n_args - 2, args + 2);
+    gf2n_t a;
+    ugf2n_load(&field, a, args[0]);
+    mp_int_t times = mp_obj_get_int(args[1]);
+    if(times < 0){
+        mp_raise_ValueError("Number of squarings can't be negative");
+    }
+    for(mp_int_t i = 0; i < times; i++){
+        gf2n_mul(&field, a, a, a);
+    }
+    return ugf2n_new_element(&field, a);
+}
+STATIC MP_DEFINE_CONST_FUN_OBJ_VAR_BETWEEN(ugf2n_sqr_obj, 4, 5, ugf2n_sqr);
+
+/****************************** mul_batch ******************************/
+
+// ugf2n.mul_batch(xs, ys, irr, nbits, mu=None)
+// multiplies elements of two sequences pairwise, returns a list
+STATIC mp_obj_t ugf2n_mul_batch(size_t n_args, const mp_obj_t *args){
+    GF2N_FIELD field;
+    ugf2n_field_init(&field, n_args - 2, args + 2);
+    size_t xlen, ylen;
+    mp_obj_t *xs, *ys;
+    mp_obj_get_array(args[0], &xlen, &xs);
+    mp_obj_get_array(args[1], &ylen, &ys);
+    if(xlen != ylen){
+        mp_raise_ValueError("Sequences should have the same length");
+    }
+    mp_obj_list_t *res = MP_OBJ_TO_PTR(mp_obj_new_list(xlen, NULL));
+    gf2n_t a, b;
+    for(size_t i = 0; i < xlen; i++){
+        ugf2n_load(&field, a, xs[i]);
+        ugf2n_load(&field, b, ys[i]);
+        gf2n_mul(&field, a, a, b);
+        res->items[i] = ugf2n_new_element(&field, a);
+    }
+    return MP_OBJ_FROM_PTR(res);
+}
+STATIC MP_DEFINE_CONST_FUN_OBJ_VAR_BETWEEN(ugf2n_mul_batch_obj, 4, 5, ugf2n_mul_batch);
+
+/****************************** dot ******************************/
+
+// ugf2n.dot(xs, ys, irr, nbits, mu=None)
+// sum of pairwise products of two sequences,
+// products are accumulated unreduced and reduced once
+STATIC mp_obj_t ugf2n_dot(size_t n_args, const mp_obj_t *args){
+    GF2N_FIELD field;
+    ugf2n_field_init(&field, n_args - 2, args + 2);
+    size_t xlen, ylen;
+    mp_obj_t *xs, *ys;
+    mp_obj_get_array(args[0], &xlen, &xs);
+    mp_obj_get_array(args[1], &ylen, &ys);
+    if(xlen != ylen){
+        mp_raise_ValueError("Sequences should have the same length");
+    }
+    gf2n_wide_t acc;
+    memset(acc, 0, sizeof(acc));
+    gf2n_t a, b;
+    for(size_t i = 0; i < xlen; i++){
+        ugf2n_load(&field, a, xs[i]);
+        ugf2n_load(&field, b, ys[i]);
+        gf2n_mul_acc(&field, acc, a, b);
+    }
+    gf2n_reduce_wide(&field, a, acc);
+    return ugf2n_new_element(&field, a);
+}
+STATIC MP_DEFINE_CONST_FUN_OBJ_VAR_BETWEEN(ugf2n_dot_obj, 4, 5, ugf2n_dot);
+
+/****************************** horner ******************************/
+
+// ugf2n.horner(coeffs, xs, irr, nbits, mu=None)
+// evaluates polynomial with coefficients coeffs (highest degree first)
+// at every point in xs, returns a list.
+// Points are public (share indexes), so every point is prepared once
+// as a constant multiplier and its zero high limbs are skipped.
+STATIC mp_obj_t ugf2n_horner(size_t n_args, const mp_obj_t *args){
+    GF2N_FIELD field;
+    ugf2n_field_init(&field, n_args - 2, args + 2);
+    size_t clen, xlen;
+    mp_obj_t *cs, *xs;
+    mp_obj_get_array(args[0], &clen, &cs);
+    mp_obj_get_array(args[1], &xlen, &xs);
+    if(clen == 0){
+        mp_raise_ValueError("Polynomial should have at least one coefficient");
+    }
+    // coefficients are shared by all points, parse them once
+    gf2n_t *coeffs = m_new(gf2n_t, clen);
+    for(size_t i = 0; i < clen; i++){
+        ugf2n_load(&field, coeffs[i], cs[i]);
+    }
+    mp_obj_list_t *res = MP_OBJ_TO_PTR(mp_obj_new_list(xlen, NULL));
+    gf2n_t x, acc;
+    GF2N_CONST xc;
+    for(size_t i = 0; i < xlen; i++){
+        ugf2n_load(&field, x, xs[i]);
+        gf2n_const_init(&field, &xc, x);
+        memcpy(acc, coeffs[0], sizeof(gf2n_t));
+        for(size_t j = 1; j < clen; j++){
+            gf2n_mul_const(&field, acc, acc, &xc);
+            gf2n_add(&field, acc, acc, coeffs[j]);
+        }
+        res->items[i] = ugf2n_new_element(&field, acc);
+    }
+    m_del(gf2n_t, coeffs, clen);
+    return MP_OBJ_FROM_PTR(res);
+}
+STATIC MP_DEFINE_CONST_FUN_OBJ_VAR_BETWEEN(ugf2n_horner_obj, 4, 5, ugf2n_horner);
+
+/****************************** MODULE ******************************/
+
+STATIC const mp_rom_map_elem_t ugf2n_module_globals_table[] = {
+    { MP_ROM_QSTR(MP_QSTR___name__), MP_ROM_QSTR(MP_QSTR_ugf2n) },
+    { MP_ROM_QSTR(MP_QSTR_mul), MP_ROM_PTR(&ugf2n_mul_obj) },
+    { MP_ROM_QSTR(MP_QSTR_sqr), MP_ROM_PTR(&ugf2n_sqr_obj) },
+    { MP_ROM_QSTR(MP_QSTR_mul_batch), MP_ROM_PTR(&ugf2n_mul_batch_obj) },
+    { MP_ROM_QSTR(MP_QSTR_dot), MP_ROM_PTR(&ugf2n_dot_obj) },
+    { MP_ROM_QSTR(MP_QSTR_horner), MP_ROM_PTR(&ugf2n_horner_obj) },
+};
+STATIC MP_DEFINE_CONST_DICT(ugf2n_module_globals, ugf2n_module_globals_table);
+
+// Define module object.
+const mp_obj_module_t ugf2n_user_cmodule = {
+    .base = { &mp_type_module },
+    .globals = (mp_obj_dict_t*)&ugf2n_module_globals,
+};
+
+// Register the module to make it available in Python
+MP_REGISTER_MODULE(MP_QSTR_ugf2n, ugf2n_user_cmodule, MODULE_UGF2N_ENABLED);